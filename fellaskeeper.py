@@ -1,121 +1,429 @@
-from datetime import date, timedelta, datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+import asyncio
+import atexit
+import functools
+import itertools
+import logging
+import logging.handlers
 import os
+import queue
+import re
+import time
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+# uvloop is a faster drop-in event loop. It has no Windows build and is optional:
+# without it the bot runs on asyncio's default loop
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 DB_URL = os.getenv("DB_URL")
 
-def get_db_connection():
-    return psycopg2.connect(DB_URL, cursor_factory=RealDictCursor)
+# Log records are queued and written by a background thread, keeping stream I/O off the event loop
+log = logging.getLogger("fellaskeeper")
+log.setLevel(logging.INFO)
+log.propagate = False
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
-def get_user_goals_mapping(user_id):
-    """Get user's goals and create a mapping from display number (1, 2, 3...) to database ID.
-    Returns a tuple: (list of goal rows, mapping dict where key=display_num, value=db_id)"""
+# Streak lengths over a "dates" CTE of one user's check-in dates. Consecutive dates share
+# the same date - row_number(), so each group is one unbroken run. Finish with FROM runs.
+_STREAK_RUNS = (
+    "runs AS ("
+    "SELECT count(*) AS len, max(date) AS last FROM ("
+    "SELECT date, date - (row_number() OVER (ORDER BY date))::int AS grp FROM dates"
+    ") g GROUP BY grp"
+    ") SELECT COALESCE((SELECT len FROM runs ORDER BY last DESC LIMIT 1), 0) AS latest, "
+    "max(last) AS last, COALESCE(max(len), 0) AS longest"
+)
+
+# Hot queries, prepared once per pooled connection so Postgres skips parse/plan on each call.
+# Call them with the matching PREPARED[name] string, e.g. fetch_all(PREPARED["goals_list"], (user_id,))
+PREPARED_STATEMENTS = {
+    "goals_list": "SELECT row_number() OVER (ORDER BY id) AS n, id, description, progress, total "
+                  "FROM goals WHERE user_id = $1 ORDER BY id",
+    "goal_insert": "INSERT INTO goals (user_id, description, total) VALUES ($1, $2, $3)",
+    # Goal number $2 (its position in the user's list) is resolved in the same statement
+    "goal_delete": "WITH ranked AS ("
+                   "SELECT id, row_number() OVER (ORDER BY id) AS n FROM goals WHERE user_id = $1"
+                   ") DELETE FROM goals g USING ranked r WHERE g.id = r.id AND r.n = $2 RETURNING g.id",
+    # Progress goes up by 1 (NULL counts as 0), capped at the goal's total
+    "goal_progress": "WITH ranked AS ("
+                     "SELECT id, row_number() OVER (ORDER BY id) AS n FROM goals WHERE user_id = $1"
+                     ") UPDATE goals g SET progress = LEAST(COALESCE(g.progress, 0) + 1, g.total) "
+                     "FROM ranked r WHERE g.id = r.id AND r.n = $2 RETURNING g.progress, g.total",
+    # Record a check-in for today ($3) unless there already is one, and return the resulting streak.
+    # The new row isn't visible to the other CTEs, so its date is added to dates explicitly.
+    "checkin_insert": "WITH ins AS ("
+                      "INSERT INTO checkins (user_id, date, rating) VALUES ($1, $3::date, $2) "
+                      "ON CONFLICT (user_id, date) DO NOTHING RETURNING date"
+                      "), dates AS (SELECT date FROM checkins WHERE user_id = $1 UNION ALL SELECT date FROM ins), "
+                      + _STREAK_RUNS + ", EXISTS (SELECT 1 FROM ins) AS inserted FROM runs",
+    "checkin_update": "UPDATE checkins SET rating = $1 WHERE user_id = $2 AND date = $3::date RETURNING rating",
+    "checkin_streak": "WITH dates AS (SELECT date FROM checkins WHERE user_id = $1), " + _STREAK_RUNS + " FROM runs",
+    # Check-ins between $2 and $3 as day offsets from $2, only for days that have one
+    "checkin_year": "SELECT date - $2::date AS off, rating FROM checkins "
+                    "WHERE user_id = $1 AND date BETWEEN $2::date AND $3::date",
+    # Same as checkin_year, for every user in the array $1 at once
+    "checkin_year_many": "SELECT user_id, date - $2::date AS off, rating FROM checkins "
+                         "WHERE user_id = ANY($1) AND date BETWEEN $2::date AND $3::date ORDER BY user_id",
+    # Create the habit if needed and, if $5, mark it done on $4 unless it already is within [$6, $7].
+    # xmax is 0 only on a freshly inserted row, so it tells creation apart from the no-op update
+    "habit_mark": "WITH habit AS ("
+                  "INSERT INTO habits (user_id, description, reset_period) VALUES ($1, $2, $3) "
+                  "ON CONFLICT (user_id, description, reset_period) DO UPDATE SET description = EXCLUDED.description "
+                  "RETURNING id, (xmax = 0) AS created"
+                  "), done AS ("
+                  "INSERT INTO habit_completions (user_id, habit_id, date) "
+                  "SELECT $1, habit.id, $4::date FROM habit WHERE $5 AND NOT EXISTS ("
+                  "SELECT 1 FROM habit_completions c WHERE c.user_id = $1 AND c.habit_id = habit.id "
+                  "AND c.date >= $6::date AND c.date <= $7::date"
+                  ") RETURNING id"
+                  ") SELECT habit.created, EXISTS (SELECT 1 FROM done) AS marked FROM habit",
+    # Every habit plus whether it has a completion in its current period ($3 today, $1 Monday, $2 the 1st)
+    "habits_status": "SELECT h.id, h.description, h.reset_period, EXISTS ("
+                     "SELECT 1 FROM habit_completions c WHERE c.user_id = h.user_id AND c.habit_id = h.id "
+                     "AND c.date >= CASE h.reset_period WHEN 'weekly' THEN $1::date WHEN 'monthly' THEN $2::date ELSE $3::date END "
+                     "AND c.date <= $3::date"
+                     ") AS completed FROM habits h WHERE h.user_id = $4 ORDER BY h.id",
+    "habit_delete": "WITH ranked AS ("
+                    "SELECT id, row_number() OVER (ORDER BY id) AS n FROM habits WHERE user_id = $1"
+                    ") DELETE FROM habits h USING ranked r WHERE h.id = r.id AND r.n = $2 RETURNING h.id",
+    # Habit number $4's completions between $2 and $3 as day offsets from $2.
+    # The LEFT JOIN keeps one row with a NULL offset when the habit has no completions.
+    "habit_year": "WITH ranked AS ("
+                  "SELECT id, description, row_number() OVER (ORDER BY id) AS n FROM habits WHERE user_id = $1"
+                  ") SELECT r.description, c.date - $2::date AS off FROM ranked r "
+                  "LEFT JOIN habit_completions c ON c.habit_id = r.id AND c.user_id = $1 AND c.date >= $2::date AND c.date <= $3::date "
+                  "WHERE r.n = $4",
+}
+
+def _execute_sql(name, query):
+    placeholders = ", ".join(["%s"] * len(set(re.findall(r"\$\d+", query))))
+    return f"EXECUTE {name} ({placeholders})"
+
+PREPARED = {name: _execute_sql(name, query) for name, query in PREPARED_STATEMENTS.items()}
+
+class PreparedConnection(PGConnection):
+    """Connection that remembers whether PREPARED_STATEMENTS exist on its session."""
+    prepared = False
+
+def prepare_statements(connection):
+    """Prepare each of PREPARED_STATEMENTS on the connection. Each one gets its own
+    transaction, so a statement that fails (e.g. a missing index) only breaks its commands."""
+    with connection:
+        with connection.cursor() as cursor:
+            # Clear anything left behind by an earlier attempt that failed halfway
+            cursor.execute("DEALLOCATE ALL")
+    for name, query in PREPARED_STATEMENTS.items():
+        try:
+            with connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"PREPARE {name} AS {query}")
+        except psycopg2.Error:
+            log.exception("Error preparing statement %s", name)
+    connection.prepared = True
+
+# Shared pool so commands reuse open connections instead of reconnecting each time
+DB_MIN_CONNECTIONS = int(os.getenv("DB_POOL_MIN", "2"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX", "10"))
+# TCP keepalives stop idle pooled connections from being silently dropped by NATs/load balancers
+POOL = ThreadedConnectionPool(
+    minconn=DB_MIN_CONNECTIONS, maxconn=DB_MAX_CONNECTIONS, dsn=DB_URL,
+    connection_factory=PreparedConnection, cursor_factory=RealDictCursor,
+    application_name="fellaskeeper",
+    keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=5
+)
+atexit.register(POOL.closeall)
+
+@contextmanager
+def db_conn():
+    """Borrow a connection from the pool for the duration of a `with` block.
+    The transaction is committed on success (rolled back on error) and the
+    connection is handed back to the pool afterwards."""
+    connection = POOL.getconn()
     try:
-        connection = get_db_connection()
+        if not connection.prepared:
+            prepare_statements(connection)
         with connection:
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "SELECT id, description, progress, total FROM goals WHERE user_id = %s ORDER BY id",
-                    (user_id,)
-                )
-                rows = cursor.fetchall()
-        connection.close()
-        
-        # Create mapping: display number (1-indexed) -> database ID
-        mapping = {}
-        for idx, row in enumerate(rows, start=1):
-            mapping[idx] = row['id']
-        
-        return rows, mapping
-    except Exception as e:
-        print(f"Error getting user goals mapping: {e}")
-        return [], {}
-
-def get_user_habits_mapping(user_id):
-    """Get user's habits and create a mapping from display number (1, 2, 3...) to database ID.
-    Returns a tuple: (list of habit rows, mapping dict where key=display_num, value=db_id)"""
+            yield connection
+    finally:
+        # Drop connections the server closed on us rather than handing them out again
+        POOL.putconn(connection, close=bool(connection.closed))
+
+# Indexes the queries below rely on (e.g. ON CONFLICT targets), applied once at startup:
+# (name, CREATE INDEX statement, statements removing rows that would violate a unique index).
+# The INCLUDE columns let the per-user reads run as index-only scans.
+SCHEMA_INDEXES = (
+    (
+        "checkins_user_date_key",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS checkins_user_date_key "
+        "ON checkins (user_id, date) INCLUDE (rating)",
+        # Older versions could record two check-ins for a day. checkins has no column recording
+        # write order (ctid is only a physical position), so keep the highest rating; among
+        # equal ratings the rows are identical and ctid just picks one of them
+        (
+            "DELETE FROM checkins a USING checkins b "
+            "WHERE a.user_id = b.user_id AND a.date = b.date "
+            "AND (COALESCE(a.rating, 0), a.ctid) < (COALESCE(b.rating, 0), b.ctid)",
+        ),
+    ),
+    (
+        "goals_user_id_idx",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS goals_user_id_idx "
+        "ON goals (user_id, id) INCLUDE (description, progress, total)",
+        (),
+    ),
+    (
+        "habits_user_description_period_key",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS habits_user_description_period_key "
+        "ON habits (user_id, description, reset_period)",
+        # Keep the oldest copy of a duplicated habit, moving the others' completions onto it first
+        (
+            "UPDATE habit_completions c SET habit_id = k.keep FROM ("
+            "SELECT id, min(id) OVER (PARTITION BY user_id, description, reset_period) AS keep FROM habits"
+            ") k WHERE c.habit_id = k.id AND k.id <> k.keep",
+            "DELETE FROM habits h USING habits k "
+            "WHERE h.user_id = k.user_id AND h.description = k.description "
+            "AND h.reset_period = k.reset_period AND h.id > k.id",
+        ),
+    ),
+    (
+        "habits_user_id_idx",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS habits_user_id_idx "
+        "ON habits (user_id, id) INCLUDE (description, reset_period)",
+        (),
+    ),
+    (
+        "habit_completions_user_habit_date_idx",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS habit_completions_user_habit_date_idx "
+        "ON habit_completions (user_id, habit_id, date)",
+        (),
+    ),
+)
+
+# Columns the queries do date arithmetic on, and that psycopg2 must hand back as datetime.date
+DATE_COLUMNS = (("checkins", "date"), ("habit_completions", "date"))
+# information_schema names of the column types _ensure_date_column will convert
+TEXT_TYPES = ("text", "character varying")
+
+def _ensure_date_column(cursor, table, column):
+    cursor.execute(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    row = cursor.fetchone()
+    if not row or row['data_type'] == 'date':
+        return
+    # Only text is converted; a timestamp would silently lose its time of day
+    if row['data_type'] not in TEXT_TYPES:
+        log.warning("Not converting %s.%s to date: it is %s, not text", table, column, row['data_type'])
+        return
+    log.warning("Converting %s.%s from %s to date", table, column, row['data_type'])
+    cursor.execute(f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE date USING "{column}"::date')
+
+def _ensure_index(cursor, name, create, cleanup):
+    # A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind, which IF NOT EXISTS
+    # would skip forever, so check validity and rebuild it rather than trusting the name
+    cursor.execute(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace",
+        (name,)
+    )
+    row = cursor.fetchone()
+    if row and row['indisvalid']:
+        return
+    if row:
+        log.warning("Rebuilding invalid index %s", name)
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    for statement in cleanup:
+        cursor.execute(statement)
+        if cursor.rowcount > 0:
+            log.warning("Fixed %d duplicate row(s) before building %s", cursor.rowcount, name)
+    cursor.execute(create)
+
+def ensure_schema():
+    """Convert any DATE_COLUMNS not stored as DATE and create any missing or invalid indexes
+    from SCHEMA_INDEXES. Bypasses db_conn() since some prepared statements depend on these.
+    Each step is attempted even if an earlier one fails."""
+    connection = POOL.getconn()
     try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "SELECT id, description, reset_period FROM habits WHERE user_id = %s ORDER BY id",
-                    (user_id,)
-                )
-                rows = cursor.fetchall()
-        connection.close()
-        
-        # Create mapping: display number (1-indexed) -> database ID
-        mapping = {}
-        for idx, row in enumerate(rows, start=1):
-            mapping[idx] = row['id']
-        
-        return rows, mapping
-    except Exception as e:
-        print(f"Error getting user habits mapping: {e}")
-        return [], {}
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            for table, column in DATE_COLUMNS:
+                try:
+                    _ensure_date_column(cursor, table, column)
+                except psycopg2.Error:
+                    log.exception("Error converting %s.%s to date", table, column)
+            for name, create, cleanup in SCHEMA_INDEXES:
+                try:
+                    _ensure_index(cursor, name, create, cleanup)
+                except psycopg2.Error:
+                    log.exception("Error creating index %s", name)
+    except psycopg2.Error:
+        log.exception("Error ensuring database schema")
+    finally:
+        connection.autocommit = False
+        POOL.putconn(connection)
+
+def warm_pool():
+    """Prepare PREPARED_STATEMENTS on the pool's idle connections before the bot starts,
+    so the first commands don't pay for it. Run after ensure_schema()."""
+    connections = []
+    try:
+        # Hold them all at once so each getconn hands out a different connection
+        for _ in range(DB_MIN_CONNECTIONS):
+            connections.append(POOL.getconn())
+        for connection in connections:
+            if not connection.prepared:
+                prepare_statements(connection)
+    except psycopg2.Error:
+        log.exception("Error warming up the connection pool")
+    finally:
+        for connection in connections:
+            POOL.putconn(connection)
+
+def _run_with_cursor(fn, *args):
+    with db_conn() as connection:
+        with connection.cursor() as cursor:
+            return fn(cursor, *args)
+
+# Dedicated threads for blocking DB calls. The pool raises instead of waiting when it runs
+# dry, so there is one worker per pooled connection and extra calls queue up here instead.
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=DB_MAX_CONNECTIONS, thread_name_prefix="db")
+atexit.register(DB_EXECUTOR.shutdown)
+
+async def run_db(fn, *args):
+    """Run fn(cursor, *args) on a pooled connection in a worker thread.
+    psycopg2 is blocking, so this keeps queries from stalling the Discord event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(DB_EXECUTOR, _run_with_cursor, fn, *args)
+
+def _fetch_all(cursor, query, params):
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+def _fetch_one(cursor, query, params):
+    cursor.execute(query, params)
+    return cursor.fetchone()
+
+def _execute(cursor, query, params):
+    cursor.execute(query, params)
+
+async def fetch_all(query, params):
+    """Run a single query off the event loop and return all rows."""
+    return await run_db(_fetch_all, query, params)
+
+async def fetch_one(query, params):
+    """Run a single query off the event loop and return the first row (or None)."""
+    return await run_db(_fetch_one, query, params)
+
+async def execute(query, params):
+    """Run a single statement off the event loop, discarding any result."""
+    await run_db(_execute, query, params)
+
+# Work currently running per key, so concurrent callers asking for the same thing share it
+_inflight = {}
+
+async def once(key, factory):
+    """Await factory() for key, or join the call already running for the same key."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield so one caller being cancelled doesn't cancel the work for the others
+    return await asyncio.shield(task)
+
+# Recently fetched goals per user: user_id -> (fetched_at, rows).
+# Entries are dropped whenever the user's goals change. Least recently used entries are
+# evicted past GOALS_CACHE_SIZE users.
+GOALS_CACHE_TTL = 30
+GOALS_CACHE_SIZE = 10_000
+_goals_cache = OrderedDict()
+
+# Bumped per user on every goal write. A load only caches its result if no write happened
+# while it was running, so goals read before a !delete can't come back after it.
+_goals_version = {}
+
+def goals_changed(user_id):
+    """Call after writing the user's goals. Also drops their cached goals."""
+    _goals_version[user_id] = _goals_version.get(user_id, 0) + 1
+    _goals_cache.pop(user_id, None)
+
+async def get_user_goals(user_id):
+    """Get user's goals in display order. Each row's n is its display number (1, 2, 3...),
+    so display number k is rows[k - 1]. Database errors propagate to the caller."""
+    cached = _goals_cache.get(user_id)
+    if cached and time.monotonic() - cached[0] < GOALS_CACHE_TTL:
+        _goals_cache.move_to_end(user_id)
+        return cached[1]
+    if cached:
+        # Expired
+        del _goals_cache[user_id]
+
+    # The version is part of the key so requests after a write don't join an older load
+    version = _goals_version.get(user_id, 0)
+    return await once(("goals", user_id, version), lambda: _load_user_goals(user_id, version))
+
+async def _load_user_goals(user_id, version):
+    rows = await fetch_all(PREPARED["goals_list"], (user_id,))
+    if version == _goals_version.get(user_id, 0):
+        _goals_cache[user_id] = (time.monotonic(), rows)
+        _goals_cache.move_to_end(user_id)
+        if len(_goals_cache) > GOALS_CACHE_SIZE:
+            _goals_cache.popitem(last=False)
+    return rows
+
+def _daily_bounds(target_date):
+    return target_date, target_date
+
+def _weekly_bounds(target_date):
+    # Monday to Sunday (weekday() returns 0=Monday, 6=Sunday)
+    start = target_date - timedelta(days=target_date.weekday())
+    return start, start + timedelta(days=6)
+
+def _monthly_bounds(target_date):
+    start = target_date.replace(day=1)
+    # Day 28 + 4 always lands in the next month, whatever the month's length
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+_PERIOD_BOUNDS = {
+    'daily': _daily_bounds,
+    'weekly': _weekly_bounds,
+    'monthly': _monthly_bounds,
+}
+
+def period_bounds(reset_period, target_date):
+    """Returns (start, end) of the period containing target_date, both inclusive.
+    Unknown periods are treated as daily."""
+    return _PERIOD_BOUNDS.get(reset_period, _daily_bounds)(target_date)
 
 def get_current_period_start(reset_period, target_date):
     """Returns the start date of the current period for a given reset period and target date.
     - Daily: returns the target_date itself
     - Weekly: returns the Monday of the week containing target_date
     - Monthly: returns the 1st of the month containing target_date"""
-    if reset_period == 'daily':
-        return target_date
-    elif reset_period == 'weekly':
-        # Get Monday of the week (weekday() returns 0=Monday, 6=Sunday)
-        days_since_monday = target_date.weekday()
-        return target_date - timedelta(days=days_since_monday)
-    elif reset_period == 'monthly':
-        # Return the 1st of the month
-        return date(target_date.year, target_date.month, 1)
-    else:
-        return target_date
-
-def is_habit_completed_in_period(user_id, habit_id, reset_period, target_date):
-    """Checks if habit is completed for the current period.
-    Returns True if there's a completion record within the current period."""
-    try:
-        period_start = get_current_period_start(reset_period, target_date)
-        
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                if reset_period == 'daily':
-                    # For daily, check if completed on the exact date
-                    cursor.execute(
-                        "SELECT id FROM habit_completions WHERE user_id = %s AND habit_id = %s AND date = %s",
-                        (user_id, habit_id, period_start)
-                    )
-                elif reset_period == 'weekly':
-                    # For weekly, check if completed any day from Monday to Sunday
-                    period_end = period_start + timedelta(days=6)
-                    cursor.execute(
-                        "SELECT id FROM habit_completions WHERE user_id = %s AND habit_id = %s AND date >= %s AND date <= %s",
-                        (user_id, habit_id, period_start, period_end)
-                    )
-                else:  # monthly
-                    # For monthly, check if completed any day in the month
-                    if period_start.month == 12:
-                        period_end = date(period_start.year + 1, 1, 1) - timedelta(days=1)
-                    else:
-                        period_end = date(period_start.year, period_start.month + 1, 1) - timedelta(days=1)
-                    cursor.execute(
-                        "SELECT id FROM habit_completions WHERE user_id = %s AND habit_id = %s AND date >= %s AND date <= %s",
-                        (user_id, habit_id, period_start, period_end)
-                    )
-                result = cursor.fetchone()
-        connection.close()
-        return result is not None
-    except Exception as e:
-        print(f"Error checking habit completion: {e}")
-        return False
+    return period_bounds(reset_period, target_date)[0]
 
 # intents
 intents = discord.Intents.default() 
@@ -128,56 +436,123 @@ bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
 # Dictionary to store user goals
 goals = {}
 
-# Emojis for daily check-in ratings
-mood_colors = {
-    1: "🔴",  # terrible
-    2: "🟠",  # bad
-    3: "🟡",  # okay
-    4: "🟢",  # good
-    5: "🔵",  # amazing
-    None: "⚪"  # no rating
-}
+# Emojis for daily check-in ratings, indexed by rating (use `rating or 0` for missing ratings)
+mood_colors = (
+    "⚪",  # no rating
+    "🔴",  # terrible
+    "🟠",  # bad
+    "🟡",  # okay
+    "🟢",  # good
+    "🔵",  # amazing
+)
+# Goal progress bars, indexed by how many of the 20 blocks are filled
+PROGRESS_BAR_LENGTH = 20
+PROGRESS_BARS = tuple("█" * i + "░" * (PROGRESS_BAR_LENGTH - i) for i in range(PROGRESS_BAR_LENGTH + 1))
+INVALID_RATING_MSG = "❌This is an invalid rating. Between 1 and 5, fam."
 
 # date and time helpers
-today = date.today()
-year = date.today().year
-start_date = date(year, 1, 1)
-end_date = date(year, 12, 31)
+@functools.lru_cache(maxsize=1)
+def _year_bounds(today_ordinal):
+    """First and last day of the year containing the given day ordinal.
+    Keyed on today's ordinal so a long-running bot rolls over at New Year."""
+    year = date.fromordinal(today_ordinal).year
+    return date(year, 1, 1), date(year, 12, 31)
+
+def year_bounds():
+    """First and last day of the current year."""
+    return _year_bounds(date.today().toordinal())
+
+@functools.lru_cache(maxsize=None)
+def _year_grid_rows(n_days):
+    """Slices of each grid row's two 7-day weeks for a year of n_days (365 or 366)."""
+    return tuple(
+        (slice(i, i + 7), slice(i + 7, i + 14))
+        for i in range(0, n_days, 14)
+    )
+
+def render_year_grid(cells):
+    """Lay out one cell per day of the year as rows of two 7-day weeks."""
+    return "".join(
+        "".join(cells[first]) + "\t" + "".join(cells[second]) + "\n"
+        for first, second in _year_grid_rows(len(cells))
+    )
 
 # Event: bot is ready
 @bot.event
 async def on_ready():
-    print(f"Successfully logged in as {bot.user.name} ☑️")
-    print("------")
-    print("No need to wait for the New Year or tomorrow. Today is ready.")
+    log.info("Successfully logged in as %s ☑️", bot.user.name)
+    log.info("No need to wait for the New Year or tomorrow. Today is ready.")
     await bot.change_presence(activity=discord.Game(name="locked in an Adderall frenzy"))
 
+# Largest value Postgres accepts for a bigint parameter
+BIGINT_MAX = 2**63 - 1
+
+async def reject_invalid_number(ctx, number, item, list_command):
+    """Reply with the not-found message when a display number can't exist (below 1, or too big
+    for the database). Returns True if rejected, so callers can return before touching the database."""
+    if 1 <= number <= BIGINT_MAX:
+        return False
+    await ctx.send(f"❌ {item} number {number} not found. Use **{list_command}** to see your {item.lower()}s.")
+    return True
+
+# Discord rejects messages over 2000 characters; keep some headroom
+MESSAGE_LIMIT = 1900
+
+def split_by_lines(msg, limit=MESSAGE_LIMIT):
+    """Split msg into chunks of at most `limit` characters, breaking between lines where possible."""
+    chunks = []
+    current = ""
+    for line in msg.splitlines(keepends=True):
+        if current and len(current) + len(line) > limit:
+            chunks.append(current)
+            current = ""
+        # A single line that is too long on its own gets cut up
+        while len(line) > limit:
+            chunks.append(line[:limit])
+            line = line[limit:]
+        current += line
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def send_long(ctx, msg):
+    """Send msg, spread over several messages if it's too long for one."""
+    for chunk in split_by_lines(msg):
+        await ctx.send(chunk)
+
+# Help menu text, assembled once at import
+HELP_TEXT = """```Commands:
+!fellashelp - Show the help menu
+!fellasping - Check if the bot is responsive
+
+--- Goals ---
+!goal <goal> <number> - Set a new goal
+!mygoals - List all your goals
+!updategoal <goal_number> - Increment goal progress by 1
+\tMake sure to check out your goal number with !mygoals first before updating
+!delete <goal_number> - Delete a goal by its number
+
+--- Habits ---
+!daily "description" [done] - Create or mark daily habit
+!weekly "description" [done] - Create or mark weekly habit
+!monthly "description" [done] - Create or mark monthly habit
+!myhabits - List all your habits
+!deletehabit <habit_number> - Delete a habit
+!myhabityear <habit_number> - View habit progress for the year
+
+--- Check-ins ---
+!checkin <rating> - Rate your day from 1 (terrible) 🤢 to 5 (amazing) 🤩
+!updatecheckin <rating> - Update today's check-in rating
+!importcheckins - Import past check-ins from an attached file (one "YYYY-MM-DD rating" per line)
+!streak - Display your current and longest check-in streak
+!myyear - Display your daily check-in ratings for the year
+```"""
+
 # simple test command
 @bot.command()
 async def fellashelp(ctx):
     """Show the help menu"""
-    await ctx.send("```" + "Commands:\n" + 
-    "!fellashelp - Show the help menu\n" + 
-    "!fellasping - Check if the bot is responsive\n" +
-    "\n--- Goals ---\n" +
-    "!goal <goal> <number> - Set a new goal\n" +
-    "!mygoals - List all your goals\n" +
-    "!updategoal <goal_number> - Increment goal progress by 1\n" +
-    "\tMake sure to check out your goal number with !mygoals first before updating\n" +
-    "!delete <goal_number> - Delete a goal by its number\n" + 
-    "\n--- Habits ---\n" +
-    "!daily \"description\" [done] - Create or mark daily habit\n" +
-    "!weekly \"description\" [done] - Create or mark weekly habit\n" +
-    "!monthly \"description\" [done] - Create or mark monthly habit\n" +
-    "!myhabits - List all your habits\n" +
-    "!deletehabit <habit_number> - Delete a habit\n" +
-    "!myhabityear <habit_number> - View habit progress for the year\n" +
-    "\n--- Check-ins ---\n" +
-    "!checkin <rating> - Rate your day from 1 (terrible) 🤢 to 5 (amazing) 🤩\n" +
-    "!updatecheckin <rating> - Update today's check-in rating\n" +
-    "!streak - Display your current and longest check-in streak\n" +
-    "!myyear - Display your daily check-in ratings for the year\n" +
-    "```")
+    await ctx.send(HELP_TEXT)
 
 @bot.command()
 async def fellasping(ctx):
@@ -192,350 +567,182 @@ async def goal(ctx, *, goal_and_number):
     try:
         description, number = goal_and_number.rsplit(" ", 1)
         number = int(number) 
-    except Exception:
+    except ValueError:
         await ctx.send("❌ Invalid goal format. Please use !goal <goal> <number>")
         return
     
     user_id = ctx.author.id
-    try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "INSERT INTO goals (user_id, description, total) VALUES (%s, %s, %s)",
-                    (user_id, description, number)
-                )
-        connection.close()
-        await ctx.send(f"Goal set ✅ ***{description}***.\nCurrently at 0/{number}. Let's friggin' go! 💪")
-    except Exception as e:
-        await ctx.send("❌ Failed to set goal. Please contact the bot admin.")
-        print(f"Error setting goal: {e}")
+    # The reply doesn't depend on the insert, so send it while the write is in flight
+    # and correct the message if the write fails
+    inserted, message = await asyncio.gather(
+        execute(PREPARED["goal_insert"], (user_id, description, number)),
+        ctx.send(f"Goal set ✅ ***{description}***.\nCurrently at 0/{number}. Let's friggin' go! 💪"),
+        return_exceptions=True
+    )
+    if isinstance(inserted, psycopg2.Error):
+        log.error("Error setting goal", exc_info=inserted)
+        failed = "❌ Failed to set goal. Please contact the bot admin."
+        if isinstance(message, BaseException):
+            await ctx.send(failed)
+        else:
+            await message.edit(content=failed)
+    elif isinstance(inserted, BaseException):
+        raise inserted
+    else:
+        goals_changed(user_id)
+    if isinstance(message, BaseException):
+        raise message
 
 @bot.command()
 async def mygoals(ctx):
     """List all goals by user_id from the database."""
     user_id = ctx.author.id
     try:
-        rows, mapping = get_user_goals_mapping(user_id)
+        rows = await get_user_goals(user_id)
 
         if not rows:
             await ctx.send("You haven't set any goals yet.\n User !goal <goal> <number> to set one! 🚀")
             return
         
-        msg = "**YOUR GOALS:**\n"
-        for display_num, row in enumerate(rows, start=1):
+        lines = ["**YOUR GOALS:**"]
+        for row in rows:
+            description = row['description'].strip('"')
             progress = row['progress'] if row['progress'] is not None else 0
-            msg += f"- {display_num} - {row['description'].strip('\"')}: {progress}/{row['total']}\n"
-        await ctx.send(msg)
-    except Exception as e:
+            lines.append(f"- {row['n']} - {description}: {progress}/{row['total']}")
+        await send_long(ctx, "\n".join(lines) + "\n")
+    except psycopg2.Error:
         await ctx.send("❌ Failed to retrieve goals. Please contact the bot admin.")
-        print(f"Error retrieving goals: {e}")
+        log.exception("Error retrieving goals")
 
 @bot.command()
 async def delete(ctx, *, id: int):
     """Delete a goal by its display number. Usage: !delete <goal_number>
     Make sure user can only delete their own goals."""
+    if await reject_invalid_number(ctx, id, "Goal", "!mygoals"):
+        return
+    
     user_id = ctx.author.id
     try:
-        # Get the mapping to translate display number to database ID
-        rows, mapping = get_user_goals_mapping(user_id)
-        
-        if id not in mapping:
-            await ctx.send(f"❌ Goal number {id} not found. Use !mygoals to see your goals.")
-            return
-        
-        # Get the actual database ID from the mapping
-        db_id = mapping[id]
-        
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "DELETE FROM goals WHERE id = %s AND user_id = %s RETURNING id;",
-                    (db_id, user_id)
-                )
-                deleted = cursor.fetchone()
-        connection.close()
+        # Resolve the display number server-side so this is a single round-trip
+        deleted = await fetch_one(PREPARED["goal_delete"], (user_id, id))
 
         if deleted:
+            goals_changed(user_id)
             await ctx.send(f"Goal number {id} deleted successfully ✅")
         else:
-            await ctx.send("❌ Goal not found or it's not your goal.")
-    except Exception as e:
+            await ctx.send(f"❌ Goal number {id} not found. Use !mygoals to see your goals.")
+    except psycopg2.Error:
         await ctx.send("❌ Failed to delete goal. Please contact the bot admin.")
-        print(f"Error deleting goal: {e}")
+        log.exception("Error deleting goal")
 
 @bot.command()
 async def updategoal(ctx, id: int):
     """Update progress on a goal by incrementing by 1. 
     Make sure to check your goal number with **!mygoals** first.
     Usage: !updategoal <goal_number>"""
+    if await reject_invalid_number(ctx, id, "Goal", "!mygoals"):
+        return
+    
     user_id = ctx.author.id
     try:
-        # Get the mapping to translate display number to database ID
-        rows, mapping = get_user_goals_mapping(user_id)
-        
-        if id not in mapping:
+        # Resolve the display number server-side and update the goal's progress
+        # by 1 (handle NULL as 0) in a single round-trip
+        updated = await fetch_one(PREPARED["goal_progress"], (user_id, id))
+
+        if not updated:
             await ctx.send(f"❌ Goal number {id} not found. Use **!mygoals** to see your goals.")
             return
-        
-        # Get the actual database ID from the mapping
-        db_id = mapping[id]
-        
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                # Update the goal's progress by 1 (handle NULL as 0)
-                cursor.execute(
-                    "UPDATE goals SET progress = LEAST(COALESCE(progress, 0) + 1, total) WHERE id = %s AND user_id = %s RETURNING progress, total;",
-                    (db_id, user_id)
-                )
-                updated = cursor.fetchone()
-        connection.close()
+        goals_changed(user_id)
 
         # Progress bar
         progress = updated['progress']
         total = updated['total']
-        bar_length = 20
-        filled_length = int(bar_length * progress // total) if total > 0 else 0
-        bar = "█" * filled_length + "░" * (bar_length - filled_length)
+        filled_length = min(PROGRESS_BAR_LENGTH * progress // total, PROGRESS_BAR_LENGTH) if total > 0 else 0
+        bar = PROGRESS_BARS[filled_length]
 
         # Percentage completion
         percentage = (progress / total) * 100 if total > 0 else 0
 
-        if updated:
-            await ctx.send(f"Goal number {id} updated successfully ✅ Current progress: {updated['progress']}/{updated['total']}\n{bar} {percentage:.1f}% done")
-        else:
-            await ctx.send("❌ Goal not found or it's not your goal.")
-    except Exception as e:
+        await ctx.send(f"Goal number {id} updated successfully ✅ Current progress: {progress}/{total}\n{bar} {percentage:.1f}% done")
+    except psycopg2.Error:
         await ctx.send("❌ Failed to update goal. Please contact the bot admin.")
-        print(f"Error updating goal: {e}")
+        log.exception("Error updating goal")
 
-@bot.command()
-async def daily(ctx, *, description_and_done=None):
-    """Create or mark a daily habit as done.
-    Usage: !daily "description" [done]"""
-    if not description_and_done:
-        await ctx.send("❌ Please provide a habit description. Usage: **!daily \"description\" [done]**")
-        return
-    
-    # Parse description and optional "done" keyword
-    description_and_done = description_and_done.strip()
-    mark_done = False
+async def mark_habit(user_id, description, reset_period, period_start, period_end, today, mark_done):
+    """Create the user's habit if it doesn't exist and, if mark_done, record a completion for
+    today unless one already exists between period_start and period_end. Runs as one statement.
+    Returns (created, marked): whether the habit is new and whether a completion was added."""
+    row = await fetch_one(
+        PREPARED["habit_mark"],
+        (user_id, description, reset_period, today, mark_done, period_start, period_end)
+    )
+    return row['created'], row['marked']
+
+def parse_habit_args(description_and_done):
+    """Split '"description" [done]' into (description, mark_done). A trailing " done" (any case)
+    marks the habit, and surrounding double then single quotes are dropped."""
+    description_and_done = (description_and_done or "").strip()
     if description_and_done.lower().endswith(" done"):
-        description = description_and_done[:-5].strip().strip('"').strip("'")
-        mark_done = True
-    else:
-        description = description_and_done.strip('"').strip("'")
-    
+        return description_and_done[:-5].strip().strip('"').strip("'"), True
+    return description_and_done.strip('"').strip("'"), False
+
+# Per-period reply wording: (span, separator after "already exists", separator after "created")
+HABIT_WORDING = {
+    'daily': ("today", " 🤪", " 🤩"),
+    'weekly': ("this week", ".", "!"),
+    'monthly': ("this month", ".", "!"),
+}
+
+async def _habit_cmd(ctx, reset_period, description_and_done):
+    """Shared body of !daily, !weekly and !monthly: create the habit and optionally mark it done."""
+    usage = f"❌ Please provide a habit description. Usage: **!{reset_period} \"description\" [done]**"
+    description, mark_done = parse_habit_args(description_and_done)
     if not description:
-        await ctx.send("❌ Please provide a habit description. Usage: **!daily \"description\" [done]**")
+        await ctx.send(usage)
         return
     
     user_id = ctx.author.id
     today = date.today()
+    label = reset_period.capitalize()
+    span, exists_sep, created_sep = HABIT_WORDING[reset_period]
     
     try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                # Check if habit exists
-                cursor.execute(
-                    "SELECT id FROM habits WHERE user_id = %s AND description = %s AND reset_period = 'daily'",
-                    (user_id, description)
-                )
-                existing_habit = cursor.fetchone()
-                
-                habit_id = None
-                if existing_habit:
-                    habit_id = existing_habit['id']
-                else:
-                    # Create new habit
-                    cursor.execute(
-                        "INSERT INTO habits (user_id, description, reset_period) VALUES (%s, %s, 'daily') RETURNING id",
-                        (user_id, description)
-                    )
-                    habit_id = cursor.fetchone()['id']
-                
-                # Mark as done if requested
-                if mark_done:
-                    # Check if already completed today
-                    cursor.execute(
-                        "SELECT id FROM habit_completions WHERE user_id = %s AND habit_id = %s AND date = %s",
-                        (user_id, habit_id, today)
-                    )
-                    already_done = cursor.fetchone()
-                    
-                    if not already_done:
-                        cursor.execute(
-                            "INSERT INTO habit_completions (user_id, habit_id, date) VALUES (%s, %s, %s)",
-                            (user_id, habit_id, today)
-                        )
-                        await ctx.send(f"✅ Daily habit **{description}** marked as done for today!")
-                    else:
-                        await ctx.send(f"✅ Daily habit **{description}** was already marked as done for today!")
-                else:
-                    if existing_habit:
-                        await ctx.send(f"Daily habit **{description}** already exists 🤪 Add 'done' to mark it as completed for today.")
-                    else:
-                        await ctx.send(f"Daily habit **{description}** created 🤩 Use **!daily \"{description}\" done** to mark it as completed.")
-        connection.close()
-    except Exception as e:
-        await ctx.send("❌ Failed to process daily habit. Please contact the bot admin.")
-        print(f"Error processing daily habit: {e}")
+        # Check against the whole period: today, Monday to Sunday, or the whole month
+        period_start, period_end = period_bounds(reset_period, today)
+        created, marked = await mark_habit(
+            user_id, description, reset_period, period_start, period_end, today, mark_done
+        )
+        if mark_done:
+            if marked:
+                await ctx.send(f"✅ {label} habit **{description}** marked as done for {span}!")
+            else:
+                await ctx.send(f"✅ {label} habit **{description}** was already marked as done for {span}!")
+        else:
+            if not created:
+                await ctx.send(f"{label} habit **{description}** already exists{exists_sep} Add 'done' to mark it as completed for {span}.")
+            else:
+                await ctx.send(f"{label} habit **{description}** created{created_sep} Use **!{reset_period} \"{description}\" done** to mark it as completed.")
+    except psycopg2.Error:
+        await ctx.send(f"❌ Failed to process {reset_period} habit. Please contact the bot admin.")
+        log.exception("Error processing %s habit", reset_period)
+
+@bot.command()
+async def daily(ctx, *, description_and_done=None):
+    """Create or mark a daily habit as done.
+    Usage: !daily "description" [done]"""
+    await _habit_cmd(ctx, 'daily', description_and_done)
 
 @bot.command()
 async def weekly(ctx, *, description_and_done=None):
     """Create or mark a weekly habit as done.
     Usage: !weekly "description" [done]"""
-    if not description_and_done:
-        await ctx.send("❌ Please provide a habit description. Usage: **!weekly \"description\" [done]**")
-        return
-    
-    # Parse description and optional "done" keyword
-    description_and_done = description_and_done.strip()
-    mark_done = False
-    if description_and_done.lower().endswith(" done"):
-        description = description_and_done[:-5].strip().strip('"').strip("'")
-        mark_done = True
-    else:
-        description = description_and_done.strip('"').strip("'")
-    
-    if not description:
-        await ctx.send("❌ Please provide a habit description. Usage: **!weekly \"description\" [done]**")
-        return
-    
-    user_id = ctx.author.id
-    today = date.today()
-    
-    try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                # Check if habit exists
-                cursor.execute(
-                    "SELECT id FROM habits WHERE user_id = %s AND description = %s AND reset_period = 'weekly'",
-                    (user_id, description)
-                )
-                existing_habit = cursor.fetchone()
-                
-                habit_id = None
-                if existing_habit:
-                    habit_id = existing_habit['id']
-                else:
-                    # Create new habit
-                    cursor.execute(
-                        "INSERT INTO habits (user_id, description, reset_period) VALUES (%s, %s, 'weekly') RETURNING id",
-                        (user_id, description)
-                    )
-                    habit_id = cursor.fetchone()['id']
-                
-                # Mark as done if requested
-                if mark_done:
-                    # Check if already completed this week
-                    period_start = get_current_period_start('weekly', today)
-                    period_end = period_start + timedelta(days=6)
-                    cursor.execute(
-                        "SELECT id FROM habit_completions WHERE user_id = %s AND habit_id = %s AND date >= %s AND date <= %s",
-                        (user_id, habit_id, period_start, period_end)
-                    )
-                    already_done = cursor.fetchone()
-                    
-                    if not already_done:
-                        cursor.execute(
-                            "INSERT INTO habit_completions (user_id, habit_id, date) VALUES (%s, %s, %s)",
-                            (user_id, habit_id, today)
-                        )
-                        await ctx.send(f"✅ Weekly habit **{description}** marked as done for this week!")
-                    else:
-                        await ctx.send(f"✅ Weekly habit **{description}** was already marked as done for this week!")
-                else:
-                    if existing_habit:
-                        await ctx.send(f"Weekly habit **{description}** already exists. Add 'done' to mark it as completed for this week.")
-                    else:
-                        await ctx.send(f"Weekly habit **{description}** created! Use **!weekly \"{description}\" done** to mark it as completed.")
-        connection.close()
-    except Exception as e:
-        await ctx.send("❌ Failed to process weekly habit. Please contact the bot admin.")
-        print(f"Error processing weekly habit: {e}")
+    await _habit_cmd(ctx, 'weekly', description_and_done)
 
 @bot.command()
 async def monthly(ctx, *, description_and_done=None):
     """Create or mark a monthly habit as done.
     Usage: !monthly "description" [done]"""
-    if not description_and_done:
-        await ctx.send("❌ Please provide a habit description. Usage: **!monthly \"description\" [done]**")
-        return
-    
-    # Parse description and optional "done" keyword
-    description_and_done = description_and_done.strip()
-    mark_done = False
-    if description_and_done.lower().endswith(" done"):
-        description = description_and_done[:-5].strip().strip('"').strip("'")
-        mark_done = True
-    else:
-        description = description_and_done.strip('"').strip("'")
-    
-    if not description:
-        await ctx.send("❌ Please provide a habit description. Usage: **!monthly \"description\" [done]**")
-        return
-    
-    user_id = ctx.author.id
-    today = date.today()
-    
-    try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                # Check if habit exists
-                cursor.execute(
-                    "SELECT id FROM habits WHERE user_id = %s AND description = %s AND reset_period = 'monthly'",
-                    (user_id, description)
-                )
-                existing_habit = cursor.fetchone()
-                
-                habit_id = None
-                if existing_habit:
-                    habit_id = existing_habit['id']
-                else:
-                    # Create new habit
-                    cursor.execute(
-                        "INSERT INTO habits (user_id, description, reset_period) VALUES (%s, %s, 'monthly') RETURNING id",
-                        (user_id, description)
-                    )
-                    habit_id = cursor.fetchone()['id']
-                
-                # Mark as done if requested
-                if mark_done:
-                    # Check if already completed this month
-                    period_start = get_current_period_start('monthly', today)
-                    if period_start.month == 12:
-                        period_end = date(period_start.year + 1, 1, 1) - timedelta(days=1)
-                    else:
-                        period_end = date(period_start.year, period_start.month + 1, 1) - timedelta(days=1)
-                    cursor.execute(
-                        "SELECT id FROM habit_completions WHERE user_id = %s AND habit_id = %s AND date >= %s AND date <= %s",
-                        (user_id, habit_id, period_start, period_end)
-                    )
-                    already_done = cursor.fetchone()
-                    
-                    if not already_done:
-                        cursor.execute(
-                            "INSERT INTO habit_completions (user_id, habit_id, date) VALUES (%s, %s, %s)",
-                            (user_id, habit_id, today)
-                        )
-                        await ctx.send(f"✅ Monthly habit **{description}** marked as done for this month!")
-                    else:
-                        await ctx.send(f"✅ Monthly habit **{description}** was already marked as done for this month!")
-                else:
-                    if existing_habit:
-                        await ctx.send(f"Monthly habit **{description}** already exists. Add 'done' to mark it as completed for this month.")
-                    else:
-                        await ctx.send(f"Monthly habit **{description}** created! Use **!monthly \"{description}\" done** to mark it as completed.")
-        connection.close()
-    except Exception as e:
-        await ctx.send("❌ Failed to process monthly habit. Please contact the bot admin.")
-        print(f"Error processing monthly habit: {e}")
+    await _habit_cmd(ctx, 'monthly', description_and_done)
 
 @bot.command()
 async def myhabits(ctx):
@@ -543,378 +750,365 @@ async def myhabits(ctx):
     user_id = ctx.author.id
     today = date.today()
     try:
-        rows, mapping = get_user_habits_mapping(user_id)
+        # One query for every habit and its current-period status, instead of one query per habit
+        rows = await fetch_all(
+            PREPARED["habits_status"],
+            (
+                get_current_period_start('weekly', today),
+                get_current_period_start('monthly', today),
+                today,
+                user_id,
+            )
+        )
 
         if not rows:
             await ctx.send("You haven't set any habits yet.\nUse **!daily**, **!weekly**, or **!monthly** to create one! 🚀")
             return
         
-        msg = "**YOUR HABITS:**\n"
+        lines = ["**YOUR HABITS:**"]
         for display_num, row in enumerate(rows, start=1):
             description = row['description'].strip('"')
             reset_period = row['reset_period']
-            habit_id = row['id']
-            
-            # Check if completed in current period
-            is_completed = is_habit_completed_in_period(user_id, habit_id, reset_period, today)
-            status = "✅ Completed" if is_completed else "❌ Not completed"
+            status = "✅ Completed" if row['completed'] else "❌ Not completed"
             
             period_label = reset_period.capitalize()
-            msg += f"- {display_num} - {description} ({period_label}) - {status}\n"
-        await ctx.send(msg)
-    except Exception as e:
+            lines.append(f"- {display_num} - {description} ({period_label}) - {status}")
+        await send_long(ctx, "\n".join(lines) + "\n")
+    except psycopg2.Error:
         await ctx.send("❌ Failed to retrieve habits. Please contact the bot admin.")
-        print(f"Error retrieving habits: {e}")
+        log.exception("Error retrieving habits")
 
 @bot.command()
 async def deletehabit(ctx, habit_number: int):
     """Delete a habit by its display number. Usage: !deletehabit <habit_number>"""
+    if await reject_invalid_number(ctx, habit_number, "Habit", "!myhabits"):
+        return
+    
     user_id = ctx.author.id
     try:
-        # Get the mapping to translate display number to database ID
-        rows, mapping = get_user_habits_mapping(user_id)
-        
-        if habit_number not in mapping:
-            await ctx.send(f"❌ Habit number {habit_number} not found. Use **!myhabits** to see your habits.")
-            return
-        
-        # Get the actual database ID from the mapping
-        db_id = mapping[habit_number]
-        
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "DELETE FROM habits WHERE id = %s AND user_id = %s RETURNING id;",
-                    (db_id, user_id)
-                )
-                deleted = cursor.fetchone()
-        connection.close()
+        # Resolve the display number server-side so this is a single round-trip
+        deleted = await fetch_one(PREPARED["habit_delete"], (user_id, habit_number))
 
         if deleted:
             await ctx.send(f"Habit number {habit_number} deleted successfully ✅")
         else:
-            await ctx.send("❌ Habit not found or it's not your habit.")
-    except Exception as e:
+            await ctx.send(f"❌ Habit number {habit_number} not found. Use **!myhabits** to see your habits.")
+    except psycopg2.Error:
         await ctx.send("❌ Failed to delete habit. Please contact the bot admin.")
-        print(f"Error deleting habit: {e}")
+        log.exception("Error deleting habit")
 
 @bot.command()
 async def myhabityear(ctx, habit_number: int):
     """Display year view for a specific habit showing completed days.
     Usage: !myhabityear <habit_number>"""
+    if await reject_invalid_number(ctx, habit_number, "Habit", "!myhabits"):
+        return
+    
     user_id = ctx.author.id
+    start_date, end_date = year_bounds()
     try:
-        # Get the mapping to translate display number to database ID
-        rows, mapping = get_user_habits_mapping(user_id)
-        
-        if habit_number not in mapping:
+        # Resolve the display number and fetch this year's completions in one round-trip
+        rows = await fetch_all(PREPARED["habit_year"], (user_id, start_date, end_date, habit_number))
+
+        if not rows:
             await ctx.send(f"❌ Habit number {habit_number} not found. Use **!myhabits** to see your habits.")
             return
-        
-        # Get the actual database ID from the mapping
-        db_id = mapping[habit_number]
-        
-        # Get habit description
-        habit_description = None
-        for row in rows:
-            if row['id'] == db_id:
-                habit_description = row['description'].strip('"')
-                break
-        
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                # Get all completions for this habit in the current year
-                cursor.execute(
-                    "SELECT date FROM habit_completions WHERE user_id = %s AND habit_id = %s AND date >= %s AND date <= %s ORDER BY date",
-                    (user_id, db_id, start_date, end_date)
-                )
-                rows = cursor.fetchall()
-        connection.close()
 
-        if not rows:
+        habit_description = rows[0]['description'].strip('"')
+        if rows[0]['off'] is None:
             await ctx.send(f"You haven't completed **{habit_description}** yet this year. Start tracking your progress! ☑️")
             return
 
-        # Map completion dates
-        completed_dates = set()
+        # One cell per day of the year, indexed by offset from January 1st
+        cells = ["⚪"] * ((end_date - start_date).days + 1)
         for row in rows:
-            completion_date = row['date']
-            if isinstance(completion_date, str):
-                completion_date = datetime.strptime(completion_date, '%Y-%m-%d').date()
-            completed_dates.add(completion_date)
-        
-        msg = f"**{habit_description}** - Your year so far:\n"
-        current_date = start_date
-
-        for week in range(27):  # 26 rows for weeks + 1 day for 365 days total
-            row = ""
-            # first 7 days
-            for i in range(7):
-                if current_date > end_date:
-                    break
-                if current_date in completed_dates:
-                    row += "🟢"  # Completed
-                else:
-                    row += "⚪"  # Not completed
-                current_date += timedelta(days=1)
-            row += "\t"
-            # next 7 days
-            for i in range(7):
-                if current_date > end_date:
-                    break
-                if current_date in completed_dates:
-                    row += "🟢"  # Completed
-                else:
-                    row += "⚪"  # Not completed
-                current_date += timedelta(days=1)               
-            msg += row + "\n"
-            if current_date > end_date:
-                break    
-        await ctx.send(msg)
-    except Exception as e:
+            cells[row['off']] = "🟢"
+
+        msg = f"**{habit_description}** - Your year so far:\n" + render_year_grid(cells)
+        await send_long(ctx, msg)
+    except psycopg2.Error:
         await ctx.send("❌ Failed to retrieve habit year view. Please contact the bot admin.")
-        print(f"Error retrieving habit year view: {e}")
+        log.exception("Error retrieving habit year view")
 
-async def get_streak(user_id):
-    """Calculate current and longest check-in streak for a user."""
-    today = date.today()
-    try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "SELECT DISTINCT date FROM checkins WHERE user_id = %s ORDER BY date ASC",
-                    (user_id,)
-                )
-                rows = cursor.fetchall()
-        connection.close()
+# Check-in streaks per user: user_id -> (length of the latest run, longest run, last check-in date).
+# Refreshed by !checkin; dropped when check-ins are imported. Least recently used entries
+# are evicted past STREAK_CACHE_SIZE users.
+STREAK_CACHE_SIZE = 10_000
+_streak_cache = OrderedDict()
 
-        if not rows:
-            return 0, 0
+# Bumped on every check-in write. A load only caches its result if no write happened while it
+# was running, so a result read before a write can't overwrite the fresher one stored after it.
+_checkin_version = 0
 
-        # Convert dates to a sorted list of date objects
-        dates = []
-        for row in rows:
-            checkin_date = row['date']
-            if isinstance(checkin_date, str):
-                checkin_date = datetime.strptime(checkin_date, '%Y-%m-%d').date()
-            dates.append(checkin_date)
-
-        # Calculate longest streak
-        longest_streak = 1
-        streak = 1
-        for i in range(1, len(dates)):
-            if (dates[i] - dates[i-1]).days == 1:
-                streak += 1
-                if streak > longest_streak:
-                    longest_streak = streak
-            else:
-                streak = 1
+def checkins_changed(user_id):
+    """Call after writing the user's check-ins, before caching anything derived from the write.
+    Also drops their cached !myyear reply."""
+    global _checkin_version
+    _checkin_version += 1
+    _year_view_cache.pop(user_id, None)
+
+def cache_streak(user_id, row):
+    """Store a streak query result (latest, longest, last) for the user."""
+    _streak_cache[user_id] = (row['latest'], row['longest'], row['last'])
+    _streak_cache.move_to_end(user_id)
+    if len(_streak_cache) > STREAK_CACHE_SIZE:
+        _streak_cache.popitem(last=False)
 
-        # Calculate current streak (how many days up to today)
-        current_streak = 0
-        current_date = today
-        i = len(dates) - 1
-        while i >= 0 and dates[i] == current_date:
-            current_streak += 1
-            current_date -= timedelta(days=1)
-            i -= 1
+# Rendered !myyear replies per user: user_id -> (first day of the year shown, message).
+# Dropped whenever the user's check-ins change. Least recently used entries are evicted
+# past YEAR_VIEW_CACHE_SIZE users.
+YEAR_VIEW_CACHE_SIZE = 1_000
+_year_view_cache = OrderedDict()
 
-        return current_streak, longest_streak
-    except Exception as e:
-        print(f"Error retrieving check-in streak: {e}")
-        return 0, 0
+async def get_streak(user_id):
+    """Calculate current and longest check-in streak for a user.
+    Database errors propagate so callers can tell them apart from having no check-ins."""
+    cached = _streak_cache.get(user_id)
+    if cached is not None:
+        _streak_cache.move_to_end(user_id)
+    else:
+        version = _checkin_version
+        # The version is part of the key so callers after a write don't join an older load
+        row = await once(("streak", user_id, version), lambda: fetch_one(PREPARED["checkin_streak"], (user_id,)))
+        cached = (row['latest'], row['longest'], row['last'])
+        if version == _checkin_version:
+            cache_streak(user_id, row)
 
+    latest, longest, last = cached
+    # The current streak is the latest run, but only while it includes today
+    return (latest if last == date.today() else 0), longest
 
 @bot.command()
 async def checkin(ctx, *, rating: int):
     """User rates their day on a scale from 1 to 5. Usage: !checkin <rating>
     1 = terrible, 5 = amazing"""
     if rating < 1 or rating > 5:
-        await ctx.send("❌This is an invalid rating. Between 1 and 5, fam.")
+        await ctx.send(INVALID_RATING_MSG)
         return
     
     user_id = ctx.author.id
+    # Dates come from the bot's clock, not the database's, so they agree with the streak check
+    today = date.today()
     try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                # Check if user already checked in today
-                cursor.execute(
-                    "SELECT user_id FROM checkins WHERE user_id = %s AND date = %s",
-                    (user_id, today)
-                )
-                existing = cursor.fetchone()
-
-                if existing:
-                    await ctx.send("⏳ You've already checked in today! If you need to update your rating, use **!updatecheckin <rating>**.")
-                    return
-
-                cursor.execute(
-                    "INSERT INTO checkins (user_id, date, rating) VALUES (%s, %s, %s)",
-                    (user_id, today, rating)
-                )
-        connection.close()
+        # One round-trip records the check-in and recomputes the streak.
+        # A conflict means today's check-in already exists, in which case inserted is false
+        row = await fetch_one(PREPARED["checkin_insert"], (user_id, rating, today))
+        if not row['inserted']:
+            await ctx.send("⏳ You've already checked in today! If you need to update your rating, use **!updatecheckin <rating>**.")
+            return
+        checkins_changed(user_id)
+        cache_streak(user_id, row)
 
-        current_streak, longest_streak = await get_streak(user_id)
-        if current_streak == 0:
-            await ctx.send("Check-in recorded, but no streak yet! Start checking in daily to build your streak! 🔥")
-        else:
-            await ctx.send(
-                f"✅ Check-in recorded! You rated your day as {mood_colors[rating]}\n"
-                f"🔥 Your current check-in streak is {current_streak} day(s)!\n"
-                f"🏆 Your longest streak is {longest_streak} day(s)!"
-                )
-    except Exception as e:
+        # The run containing today's new check-in is the latest one, so it is the current streak
+        # and is at least 1; everything goes out in a single message
+        await ctx.send(
+            f"✅ Check-in recorded! You rated your day as {mood_colors[rating]}\n"
+            f"🔥 Your current check-in streak is {row['latest']} day(s)!\n"
+            f"🏆 Your longest streak is {row['longest']} day(s)!"
+            )
+    except psycopg2.Error:
         await ctx.send("❌ Failed to record check-in. Please contact the bot admin.")
-        print(f"Error recording check-in: {e}")
+        log.exception("Error recording check-in")
 
 @bot.command()
 async def updatecheckin(ctx, *, rating: int):
     """Update today's check-in rating. Usage: !updatecheckin <rating>
     1 = terrible, 5 = amazing"""
     if rating < 1 or rating > 5:
-        await ctx.send("❌This is an invalid rating. Between 1 and 5, fam.")
+        await ctx.send(INVALID_RATING_MSG)
         return
     
-    today = date.today()
     user_id = ctx.author.id
     try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                # Check if user has checked in today
-                cursor.execute(
-                    "SELECT user_id FROM checkins WHERE user_id = %s AND date = %s",
-                    (user_id, today)
-                )
-                existing = cursor.fetchone()
-
-                if not existing:
-                    await ctx.send("❌ You haven't checked in today yet! Use **!checkin <rating>** to record your rating.")
-                    return
-
-                cursor.execute(
-                    "UPDATE checkins SET rating = %s WHERE user_id = %s AND date = %s",
-                    (rating, user_id, today)
-                )
-        connection.close()
+        # Only touches an existing row, so nothing returned means no check-in today
+        updated = await fetch_one(PREPARED["checkin_update"], (rating, user_id, date.today()))
+        if not updated:
+            await ctx.send("❌ You haven't checked in today yet! Use **!checkin <rating>** to record your rating.")
+            return
+        checkins_changed(user_id)
         await ctx.send(f"✅ Check-in updated! You rated your day as {mood_colors[rating]}\n")
-    except Exception as e:
+    except psycopg2.Error:
         await ctx.send("❌ Failed to update check-in. Please contact the bot admin.")
-        print(f"Error updating check-in: {e}")
+        log.exception("Error updating check-in")
+
+def _import_checkins(cursor, rows):
+    """Bulk-insert (user_id, date, rating) rows, skipping days that already have a check-in.
+    Returns the number of rows actually inserted."""
+    inserted = execute_values(
+        cursor,
+        "INSERT INTO checkins (user_id, date, rating) VALUES %s ON CONFLICT (user_id, date) DO NOTHING RETURNING 1",
+        rows,
+        page_size=1000,
+        fetch=True
+    )
+    return len(inserted)
+
+# Plenty for years of "YYYY-MM-DD rating" lines, and small enough to parse in a blink
+IMPORT_MAX_BYTES = 128 * 1024
+
+def parse_checkin_import(text, user_id, today):
+    """Parse "YYYY-MM-DD rating" lines (a comma also works as the separator) into
+    (user_id, date, rating) rows. Returns (rows, None), or (None, line_number) for the first
+    line that isn't valid (ratings must be 1-5 and dates can't be in the future)."""
+    rows = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            day, rating = line.replace(",", " ").split()
+            day = date.fromisoformat(day)
+            rating = int(rating)
+            if rating < 1 or rating > 5 or day > today:
+                raise ValueError
+        except ValueError:
+            return None, line_number
+        rows.append((user_id, day, rating))
+    return rows, None
+
+@bot.command()
+async def importcheckins(ctx):
+    """Import past check-ins from an attached text file with one `YYYY-MM-DD rating` per line.
+    Days you've already checked in are left alone. Usage: !importcheckins (with the file attached)"""
+    if not ctx.message.attachments:
+        await ctx.send("❌ Please attach a file with one `YYYY-MM-DD rating` per line. Usage: **!importcheckins**")
+        return
+
+    attachment = ctx.message.attachments[0]
+    if attachment.size > IMPORT_MAX_BYTES:
+        await ctx.send(f"❌ The attached file is too big. Imports are limited to {IMPORT_MAX_BYTES // 1024} KB.")
+        return
+
+    user_id = ctx.author.id
+    today = date.today()
+    try:
+        text = (await attachment.read()).decode("utf-8")
+    except (discord.HTTPException, UnicodeDecodeError):
+        await ctx.send("❌ Couldn't read the attached file. Make sure it's a plain text file.")
+        log.exception("Error reading check-in import file")
+        return
+
+    # Parse in a worker thread so a long file doesn't hold up the event loop
+    loop = asyncio.get_running_loop()
+    rows, bad_line = await loop.run_in_executor(None, parse_checkin_import, text, user_id, today)
+    if bad_line is not None:
+        await ctx.send(f"❌ Line {bad_line} isn't a valid `YYYY-MM-DD rating` entry (rating 1-5, no future dates). Nothing was imported.")
+        return
+
+    if not rows:
+        await ctx.send("❌ The attached file has no check-ins in it.")
+        return
+
+    try:
+        inserted = await run_db(_import_checkins, rows)
+        checkins_changed(user_id)
+        _streak_cache.pop(user_id, None)
+        await ctx.send(f"✅ Imported {inserted} check-in(s). {len(rows) - inserted} day(s) already had a check-in and were skipped.")
+    except psycopg2.Error:
+        await ctx.send("❌ Failed to import check-ins. Please contact the bot admin.")
+        log.exception("Error importing check-ins")
 
 @bot.command()
 async def streak(ctx):
     """Display user's current and longest check-in streak."""
     user_id = ctx.author.id
-    today = date.today()
     try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "SELECT DISTINCT date FROM checkins WHERE user_id = %s ORDER BY date ASC",
-                    (user_id,)
-                )
-                rows = cursor.fetchall()
-        connection.close()
+        current_streak, longest_streak = await get_streak(user_id)
 
-        if not rows:
+        # Any check-in at all makes the longest streak at least 1
+        if longest_streak == 0:
             await ctx.send("You haven't made any check-ins yet. Use **!checkin <rating>** to start tracking your days! ☑️")
             return
 
-        # Convert dates to a sorted list of date objects
-        dates = []
-        for row in rows:
-            checkin_date = row['date']
-            if isinstance(checkin_date, str):
-                checkin_date = datetime.strptime(checkin_date, '%Y-%m-%d').date()
-            dates.append(checkin_date)
-
-        # Calculate longest streak
-        longest_streak = 1
-        streak = 1
-        for i in range(1, len(dates)):
-            if (dates[i] - dates[i-1]).days == 1:
-                streak += 1
-                if streak > longest_streak:
-                    longest_streak = streak
-            else:
-                streak = 1
-
-        # Calculate current streak (how many days up to today)
-        current_streak = 0
-        current_date = today
-        i = len(dates) - 1
-        while i >= 0 and dates[i] == current_date:
-            current_streak += 1
-            current_date -= timedelta(days=1)
-            i -= 1
-
         await ctx.send(
             f"🔥 Your current check-in streak is {current_streak} day(s)!\n"
             f"🏆 Your longest streak is {longest_streak} day(s)!"
         )
-    except Exception as e:
+    except psycopg2.Error:
         await ctx.send("❌ Failed to retrieve check-in streak. Please contact the bot admin.")
-        print(f"Error retrieving check-in streak: {e}")
+        log.exception("Error retrieving check-in streak")
+
+
+def render_checkin_year(rows, start_date, end_date):
+    """Render an iterable of checkin_year rows (day offset and rating) as a year grid of mood colors."""
+    # One cell per day of the year, indexed by offset from January 1st
+    cells = [mood_colors[0]] * ((end_date - start_date).days + 1)
+    for row in rows:
+        cells[row['off']] = mood_colors[row['rating'] or 0]
+    return render_year_grid(cells)
 
+def _build_year_grids(cursor, user_ids, start_date, end_date):
+    cursor.execute(PREPARED["checkin_year_many"], (user_ids, start_date, end_date))
+    # Rows come back ordered by user, so each user's run of rows goes straight to render_checkin_year
+    # without copying the whole result into a list of dicts first
+    return {
+        user_id: render_checkin_year(rows, start_date, end_date)
+        for user_id, rows in itertools.groupby(cursor, key=lambda row: row['user_id'])
+    }
+
+async def build_all_year_grids(user_ids):
+    """Render this year's check-in grid for many users with a single query, e.g. for a digest.
+    Returns {user_id: grid}, only for users who have checked in this year.
+    Check-ins aren't tied to a server, so only pass users who agreed to share their ratings."""
+    start_date, end_date = year_bounds()
+    return await run_db(_build_year_grids, list(user_ids), start_date, end_date)
+
+async def _load_year_view(user_id, start_date, end_date, version):
+    """Render and cache the user's !myyear reply. Returns None if they haven't checked in this year.
+    The reply is only cached if no check-ins were written since version was read."""
+    rows = await fetch_all(PREPARED["checkin_year"], (user_id, start_date, end_date))
+    if not rows:
+        return None
+    msg = " **Your year so far:** \n" + render_checkin_year(rows, start_date, end_date)
+    if version == _checkin_version:
+        _year_view_cache[user_id] = (start_date, msg)
+        _year_view_cache.move_to_end(user_id)
+        if len(_year_view_cache) > YEAR_VIEW_CACHE_SIZE:
+            _year_view_cache.popitem(last=False)
+    return msg
 
 # Display days ratings
 @bot.command()
 async def myyear(ctx):
     """Display user's daily check-in ratings for the year."""
     user_id = ctx.author.id
+    start_date, end_date = year_bounds()
     try:
-        connection = get_db_connection()
-        with connection:
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "SELECT date, rating FROM checkins WHERE user_id = %s ORDER BY date",
-                    (user_id,)
-                )
-                rows = cursor.fetchall()
-        connection.close()
+        # Nothing has changed since the last render, so resend it without touching the database
+        cached = _year_view_cache.get(user_id)
+        if cached and cached[0] == start_date:
+            _year_view_cache.move_to_end(user_id)
+            await send_long(ctx, cached[1])
+            return
+        if cached:
+            # Left over from last year
+            del _year_view_cache[user_id]
 
-        if not rows:
-            await ctx.send("You haven't made any check-ins yet. Use **!checkin <rating>** to start tracking your days! ☑️")
+        # The version is part of the key so requests after a write don't join an older load
+        version = _checkin_version
+        msg = await once(
+            ("year", user_id, start_date, version),
+            lambda: _load_year_view(user_id, start_date, end_date, version)
+        )
+
+        if msg is None:
+            await ctx.send("You haven't made any check-ins this year yet. Use **!checkin <rating>** to start tracking your days! ☑️")
             return
 
-        # Map checkins dates to ratings
-        day_to_rating = {}
-        for row in rows:
-            checkin_date = row['date']
-            rating = row['rating']
-            day_to_rating[checkin_date] = rating
-        
-        msg = " **Your year so far:** \n"
-        current_date = start_date
-
-        for week in range (27): # 26 rows for weeks + 1 day for 365 days total
-            row = ""
-            # first 7 days
-            for i in range(7):
-                if current_date > end_date:
-                    break
-                rating = day_to_rating.get(current_date, None)
-                row += mood_colors[rating]
-                current_date += timedelta(days=1)
-            row += "\t"
-            # next 7 days
-            for i in range(7):
-                if current_date > end_date:
-                    break
-                rating = day_to_rating.get(current_date, None)
-                row += mood_colors[rating]
-                current_date += timedelta(days=1)               
-            msg += row + "\n"
-            if current_date > end_date:
-                break    
-        await ctx.send(msg)
-    except Exception as e:
+        await send_long(ctx, msg)
+    except psycopg2.Error:
         await ctx.send("❌ Failed to retrieve check-ins. Please contact the bot admin.")
-        print(f"Error retrieving check-ins: {e}")
-bot.run(DISCORD_TOKEN)
\ No newline at end of file
+        log.exception("Error retrieving check-ins")
+
+ensure_schema()
+warm_pool()
+
+async def main():
+    async with bot:
+        await bot.start(DISCORD_TOKEN)
+
+# Same as bot.run(), but on uvloop when it's installed (uvloop.run needs no event loop policy)
+discord.utils.setup_logging()
+try:
+    (uvloop.run if uvloop else asyncio.run)(main())
+except KeyboardInterrupt:
+    pass